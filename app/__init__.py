@@ -1,26 +1,59 @@
 import os
+import asyncio
+import threading
 from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
 from flasgger import Swagger
+from cachetools import TTLCache
+from sqlalchemy import event
+from app.config import DevelopmentConfig, TestingConfig, ProductionConfig
+from app.utils.jwt_cache import CachingJWTManager
+from app.utils.json_provider import OrjsonProvider
+
+# Config classes by environment name, resolved without an import per app
+_CONFIGS = {
+    'development': DevelopmentConfig,
+    'testing': TestingConfig,
+    'production': ProductionConfig
+}
 
 # Initialize extensions
 db = SQLAlchemy()
 migrate = Migrate()
-jwt = JWTManager()
+jwt = CachingJWTManager()
 bcrypt = Bcrypt()
 swagger = Swagger()
 
+# Short-lived snapshots of authenticated users, keyed by JWT id, so repeated
+# requests with the same token skip the users SELECT
+_user_cache = TTLCache(maxsize=10000, ttl=30)
+_user_cache_lock = threading.Lock()
+
+# Process-wide event loop for async service calls, run in a daemon thread
+_async_loop = None
+_async_loop_lock = threading.Lock()
+
+def get_async_loop():
+    """Return the background event loop, starting its thread on first use."""
+    global _async_loop
+    with _async_loop_lock:
+        if _async_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='async-loop', daemon=True).start()
+            _async_loop = loop
+    return _async_loop
+
 def create_app(config_name=None):
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
     
     # Load configuration
     if config_name is None:
         config_name = os.getenv('FLASK_ENV', 'development')
-    app.config.from_object(f'app.config.{config_name.capitalize()}Config')
+    app.config.from_object(_CONFIGS[config_name.lower()])
     
     # Initialize extensions with app
     CORS(app)
@@ -28,23 +61,48 @@ def create_app(config_name=None):
     migrate.init_app(app, db)
     jwt.init_app(app)
     bcrypt.init_app(app)
+    app.extensions['async_loop'] = get_async_loop()
+    
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        async_commit = app.config['CHAT_HISTORY_ASYNC_COMMIT']
+        
+        with app.app_context():
+            @event.listens_for(db.engine, 'connect')
+            def set_sqlite_pragmas(dbapi_connection, connection_record):
+                # Let readers run alongside the history writer
+                cursor = dbapi_connection.cursor()
+                cursor.execute('PRAGMA journal_mode=WAL')
+                if async_commit:
+                    # Group commits sync to disk once per checkpoint rather
+                    # than on every commit; see CHAT_HISTORY_ASYNC_COMMIT
+                    cursor.execute('PRAGMA synchronous=NORMAL')
+                cursor.close()
     
     # Setup JWT loaders
     @jwt.user_identity_loader
     def user_identity_lookup(user):
-        # Convert any user identity to a string before creating a JWT
+        # Convert any user identity to a string before creating a JWT;
+        # PyJWT requires the subject claim to be a string
         return str(user)
     
     @jwt.user_lookup_loader
     def user_lookup_callback(_jwt_header, jwt_data):
         # This is called when @jwt_required() is used
-        identity = jwt_data["sub"]
         from app.models.user import User
-        # Try to convert the identity back to an integer for database lookup
-        try:
-            return User.query.get(int(identity))
-        except ValueError:
-            return None
+        key = jwt_data["jti"]
+        with _user_cache_lock:
+            snapshot = _user_cache.get(key)
+        if snapshot is not None:
+            return User.from_snapshot(snapshot)
+        
+        # The subject is always a user id written by user_identity_lookup,
+        # so it converts straight back to an integer primary key
+        user = db.session.get(User, int(jwt_data["sub"]), options=[User.profile_columns()])
+        
+        if user is not None:
+            with _user_cache_lock:
+                _user_cache[key] = user.to_snapshot()
+        return user
     
     # JWT error handlers
     @jwt.expired_token_loader
@@ -61,6 +119,11 @@ def create_app(config_name=None):
             'message': 'Signature verification failed.'
         }), 401
     
+    @jwt.user_lookup_error_loader
+    def user_lookup_error_callback(jwt_header, jwt_payload):
+        # The token is valid but its user no longer exists
+        return jsonify({'error': 'User not found'}), 404
+    
     @jwt.unauthorized_loader
     def missing_token_callback(error):
         return jsonify({
@@ -80,14 +143,10 @@ def create_app(config_name=None):
     app.register_blueprint(auth_bp, url_prefix='/api')
     app.register_blueprint(chat_bp, url_prefix='/api')
     
-    # Create database tables if they don't exist
-    with app.app_context():
-        db.create_all()
-        
-        # Initialize LlamaService
-        from app.services.llama_service import get_llama_service
-        llama_service = get_llama_service()
-        # No need to explicitly initialize the index
-        # The index will be created as needed when the service methods are called
+    # The schema is managed by Alembic (`flask db upgrade`); only the
+    # test suite builds it directly
+    if app.config['TESTING']:
+        with app.app_context():
+            db.create_all()
     
     return app 
\ No newline at end of file
@@ -1,6 +1,21 @@
 import os
 from datetime import timedelta
 
+def engine_options(database_uri, pool_size=10, max_overflow=20):
+    """Build connection pool settings for server databases.
+    
+    SQLite manages its own connections, so no pool options are applied to it.
+    """
+    if not database_uri.startswith(('postgresql', 'mysql')):
+        return {}
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': 30,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True
+    }
+
 class Config:
     """Base config."""
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
@@ -8,6 +23,19 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(os.getenv('DATABASE_URL', ''))
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+    
+    # Commit chat history off the response path once the row id is known. Off by
+    # default: while on, a returned chat_id may not be readable until the
+    # background commit lands, and never will be if that commit fails. On SQLite
+    # it also sets synchronous=NORMAL, so a power loss can drop the most
+    # recently committed rows
+    CHAT_HISTORY_ASYNC_COMMIT = os.getenv('CHAT_HISTORY_ASYNC_COMMIT', 'False').lower() in ['true', '1', 't']
+    # Most rows the background writer inserts and commits together
+    CHAT_HISTORY_BATCH_SIZE = int(os.getenv('CHAT_HISTORY_BATCH_SIZE', 100))
+    # Seconds a request waits for the writer before writing its row itself
+    CHAT_HISTORY_WRITE_TIMEOUT = float(os.getenv('CHAT_HISTORY_WRITE_TIMEOUT', 10))
     
     # OpenAI configuration
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
@@ -17,6 +45,18 @@ class Config:
     LLAMA_CLOUD_INDEX_NAME = os.getenv('LLAMA_CLOUD_INDEX_NAME', 'leadership-chatbot')
     LLAMA_CLOUD_PROJECT_NAME = os.getenv('LLAMA_CLOUD_PROJECT_NAME', 'Default')
     LLAMA_CLOUD_ORGANIZATION_ID = os.getenv('LLAMA_CLOUD_ORGANIZATION_ID', '')
+    LLAMA_RESPONSE_TIMEOUT = int(os.getenv('LLAMA_RESPONSE_TIMEOUT', 60))
+    
+    # Questions arriving within the batch window are dispatched together, with
+    # at most LLAMA_CONCURRENCY agent runs in flight per process
+    LLAMA_BATCH_SIZE = int(os.getenv('LLAMA_BATCH_SIZE', 8))
+    LLAMA_BATCH_WINDOW_MS = int(os.getenv('LLAMA_BATCH_WINDOW_MS', 10))
+    LLAMA_CONCURRENCY = int(os.getenv('LLAMA_CONCURRENCY', 32))
+    
+    # Answer near-duplicate questions from cached responses by embedding similarity
+    SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'True').lower() in ['true', '1', 't']
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.92))
+    SEMANTIC_CACHE_SIZE = int(os.getenv('SEMANTIC_CACHE_SIZE', 1000))
     
     # Swagger configuration
     SWAGGER = {
@@ -59,7 +99,11 @@ class TestingConfig(Config):
     FLASK_ENV = 'testing'
     DEBUG = True
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = os.getenv('TEST_DATABASE_URL', 'sqlite:///leadership_chatbot_test.db')
+    BCRYPT_LOG_ROUNDS = 4  # Minimum cost; hashing strength is irrelevant in tests
+    CHAT_HISTORY_ASYNC_COMMIT = False  # Tests read rows back right after writing them
+    SEMANTIC_CACHE_ENABLED = False  # Embedding questions would call OpenAI
+    SQLALCHEMY_DATABASE_URI = os.getenv('TEST_DATABASE_URL', 'sqlite://')  # In-memory; Flask-SQLAlchemy shares one connection
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
 
 class ProductionConfig(Config):
     """Production config."""
@@ -72,4 +116,9 @@ class ProductionConfig(Config):
     
     # These can be overridden by environment variables
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=int(os.getenv('JWT_ACCESS_EXPIRE_MINUTES', 30)))
-    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.getenv('JWT_REFRESH_EXPIRE_DAYS', 7))) 
\ No newline at end of file
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.getenv('JWT_REFRESH_EXPIRE_DAYS', 7)))
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI,
+        pool_size=int(os.getenv('DB_POOL_SIZE', 20)),
+        max_overflow=int(os.getenv('DB_MAX_OVERFLOW', 40))
+    )
\ No newline at end of file
@@ -11,6 +11,11 @@ class ChatHistory(db.Model):
     response = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Serves per-user history pages, newest first, straight from the index
+    __table_args__ = (
+        db.Index('ix_chat_user_ts', user_id, timestamp.desc()),
+    )
+    
     def __init__(self, user_id, question, response):
         self.user_id = user_id
         self.question = question
@@ -26,5 +31,5 @@ class ChatHistory(db.Model):
             'user_id': self.user_id,
             'question': self.question,
             'response': self.response,
-            'timestamp': self.timestamp.isoformat()
+            'timestamp': self.timestamp
         } 
\ No newline at end of file
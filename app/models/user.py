@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy.orm import load_only, make_transient_to_detached
 from app import db, bcrypt
 
 class User(db.Model):
@@ -38,6 +39,33 @@ class User(db.Model):
             'id': self.id,
             'username': self.username,
             'email': self.email,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
-        } 
\ No newline at end of file
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        } 
+    
+    @classmethod
+    def profile_columns(cls):
+        """Query option loading the public profile columns, without the password hash."""
+        return load_only(cls.id, cls.username, cls.email, cls.created_at, cls.updated_at)
+    
+    def to_snapshot(self):
+        """Return the profile fields cached for authenticated requests."""
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+    
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Rebuild a session-bound user from a snapshot without querying.
+        
+        Fields missing from the snapshot are loaded on first access.
+        """
+        user = cls.__mapper__.class_manager.new_instance()
+        for key, value in snapshot.items():
+            setattr(user, key, value)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
\ No newline at end of file
@@ -1,21 +1,61 @@
+import hmac
+import secrets
+import threading
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, current_user
 from flasgger import swag_from
 from app import db
 from app.models.user import User
 from app.utils.security import validate_email, validate_password, sanitize_input
-from marshmallow import Schema, fields, validate, ValidationError
+import orjson
+from marshmallow import Schema, fields, validate, ValidationError, EXCLUDE
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from cachetools import TTLCache
 
 auth_bp = Blueprint('auth', __name__)
 
 class UserSchema(Schema):
     """Schema for validating user data."""
+    class Meta:
+        unknown = EXCLUDE
+        render_module = orjson
+    
     username = fields.Str(required=True, validate=validate.Length(min=3, max=50))
     email = fields.Email(required=True)
     password = fields.Str(required=True, validate=validate.Length(min=8))
 
 user_schema = UserSchema()
 
+# Credentials verified in the last few seconds, so bursts of repeated logins
+# don't each pay for a bcrypt compare. Only successful checks are stored, keyed
+# by an HMAC of the credentials and holding the hash they matched.
+_verified_logins = TTLCache(maxsize=1024, ttl=5)
+_verified_logins_lock = threading.Lock()
+
+# The cache never leaves this process, so its keys are derived from a random
+# per-process secret rather than configuration
+_verified_logins_key = secrets.token_bytes(32)
+
+def _check_login(user, password):
+    """Check a login password, reusing a recent successful verification."""
+    key = hmac.new(
+        _verified_logins_key,
+        f'{user.id}:{password}'.encode(),
+        'sha256'
+    ).digest()
+    with _verified_logins_lock:
+        verified_hash = _verified_logins.get(key)
+    if verified_hash is not None and hmac.compare_digest(verified_hash, user.password_hash):
+        return True
+    
+    if not user.check_password(password):
+        return False
+    
+    with _verified_logins_lock:
+        _verified_logins[key] = user.password_hash
+    return True
+
 @auth_bp.route('/signup', methods=['POST'])
 @swag_from({
     'tags': ['Authentication'],
@@ -77,13 +117,13 @@ user_schema = UserSchema()
 })
 def signup():
     """Register a new user."""
-    data = request.get_json()
-    
-    # Validate input data
+    # Validate input data, decoding the raw request body directly
     try:
-        validated_data = user_schema.load(data)
+        validated_data = user_schema.loads(request.get_data(cache=False))
     except ValidationError as err:
         return jsonify({'error': err.messages}), 400
+    except ValueError:
+        return jsonify({'error': 'Request body must be valid JSON'}), 400
     
     username = sanitize_input(validated_data['username'])
     email = validated_data['email']
@@ -99,17 +139,23 @@ def signup():
     if not is_valid_password:
         return jsonify({'error': password_msg}), 400
     
-    # Check if user already exists
-    if User.query.filter_by(username=username).first():
-        return jsonify({'error': 'Username already exists'}), 409
-    
-    if User.query.filter_by(email=email).first():
+    # Check if user already exists with a single lookup on both fields
+    existing = User.query.with_entities(User.username, User.email)\
+        .filter(or_(User.username == username, User.email == email)).first()
+    if existing:
+        if existing.username == username:
+            return jsonify({'error': 'Username already exists'}), 409
         return jsonify({'error': 'Email already exists'}), 409
     
     # Create new user
     new_user = User(username=username, email=email, password=password)
     db.session.add(new_user)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent signup claimed the username or email first
+        db.session.rollback()
+        return jsonify({'error': 'Username or email already exists'}), 409
     
     return jsonify({
         'message': 'User created successfully',
@@ -175,7 +221,7 @@ def login():
     
     user = User.query.filter_by(username=username).first()
     
-    if not user or not user.check_password(password):
+    if not user or not _check_login(user, password):
         return jsonify({'error': 'Invalid credentials'}), 401
     
     # Create tokens - the user_identity_loader will handle conversion to string
@@ -256,17 +302,19 @@ def refresh():
                     'error': {'type': 'string'}
                 }
             }
+        },
+        404: {
+            'description': 'User not found',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            }
         }
     }
 })
 def get_user():
     """Get current user information."""
-    current_user_id = get_jwt_identity()
-    # The user_lookup_loader will handle conversion for jwt_required routes, 
-    # but we can also do it manually for get_jwt_identity
-    user = User.query.get(int(current_user_id))
-    
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-    
-    return jsonify({'user': user.to_dict()}), 200 
\ No newline at end of file
+    # Loaded by the user_lookup_loader without the password hash
+    return jsonify({'user': current_user.to_dict()}), 200 
\ No newline at end of file
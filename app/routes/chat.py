@@ -1,24 +1,54 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity, current_user
+from flask import Blueprint, Response, request, jsonify, current_app, g, stream_with_context
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, current_user
+from flask_jwt_extended.config import config as jwt_config
 from flasgger import swag_from
 from app import db
-from app.models.user import User
 from app.models.chat_history import ChatHistory
-from app.services.llama_service import get_llama_service
+from app.services.llama_service import get_llama_service, ERROR_RESPONSE
+from app.services.history_writer import save_chat_history
 from app.utils.security import sanitize_input
-from marshmallow import Schema, fields, ValidationError
+import orjson
+from marshmallow import Schema, fields, ValidationError, EXCLUDE
+from sqlalchemy import select, func
+from cachetools import TTLCache
 import asyncio
+import concurrent.futures
+import hashlib
+import queue
+import threading
 
 chat_bp = Blueprint('chat', __name__)
 
+@chat_bp.before_request
+def require_jwt():
+    """Verify the JWT once for every chat route and keep its identity on g."""
+    # CORS preflight requests carry no token; verify_jwt_in_request lets them
+    # through, but there is then no identity to read
+    if request.method in jwt_config.exempt_methods:
+        return
+    
+    verify_jwt_in_request()
+    g.jwt_identity = get_jwt_identity()
+
 class QuestionSchema(Schema):
     """Schema for validating question data."""
+    class Meta:
+        unknown = EXCLUDE
+        render_module = orjson
+    
     question = fields.Str(required=True)
 
 question_schema = QuestionSchema()
 
+# Recent answers keyed by normalized question, so recurring questions skip the LLM
+_answer_cache = TTLCache(maxsize=2000, ttl=3600)
+_answer_cache_lock = threading.Lock()
+
+def _answer_key(question):
+    """Build the answer cache key for a sanitized question."""
+    return hashlib.sha256(question.strip().lower().encode()).digest()
+
 @chat_bp.route('/ask-question', methods=['POST'])
-@jwt_required()
 @swag_from({
     'tags': ['Chat'],
     'summary': 'Ask a question to the chatbot',
@@ -46,7 +76,13 @@ question_schema = QuestionSchema()
                 'properties': {
                     'question': {'type': 'string'},
                     'response': {'type': 'string'},
-                    'chat_id': {'type': 'integer'}
+                    'chat_id': {
+                        'type': 'integer',
+                        'description': (
+                            'ID of the stored chat item. With CHAT_HISTORY_ASYNC_COMMIT enabled it is '
+                            'returned before the row is committed, so it may not be readable immediately.'
+                        )
+                    }
                 }
             }
         },
@@ -67,58 +103,227 @@ question_schema = QuestionSchema()
                     'error': {'type': 'string'}
                 }
             }
+        },
+        504: {
+            'description': 'Chatbot response timed out',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            }
         }
     }
 })
 def ask_question():
     """Ask a question to the chatbot."""
-    data = request.get_json()
-    
-    # Validate input data
+    # Validate input data, decoding the raw request body directly
     try:
-        validated_data = question_schema.load(data)
+        validated_data = question_schema.loads(request.get_data(cache=False))
     except ValidationError as err:
         return jsonify({'error': err.messages}), 400
+    except ValueError:
+        return jsonify({'error': 'Request body must be valid JSON'}), 400
     
-    # Get user ID from JWT token
-    user_id = get_jwt_identity()
-    
-    # Ensure user exists
-    user = User.query.get(int(user_id))
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
+    # The user was already loaded by the user_lookup_loader
+    user = current_user
     
     # Sanitize the question
     question = sanitize_input(validated_data['question'])
     
-    # Get response from LlamaService
-    llama_service = get_llama_service()
+    # Recurring questions are answered from the cache
+    key = _answer_key(question)
+    with _answer_cache_lock:
+        response = _answer_cache.get(key)
     
-    # Create a new event loop and run the coroutine
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        response = loop.run_until_complete(llama_service.get_response(question))
-    finally:
-        loop.close()
+    if response is None:
+        response = _ask_llama(question)
+        if response is None:
+            return jsonify({'error': 'The chatbot took too long to respond'}), 504
+        if response != ERROR_RESPONSE:
+            with _answer_cache_lock:
+                _answer_cache[key] = response
     
     # Store the question and response in chat history
-    chat_history = ChatHistory(
-        user_id=user.id,
-        question=question,
-        response=response
-    )
-    db.session.add(chat_history)
-    db.session.commit()
+    chat_id = save_chat_history(user.id, question, response)
     
     return jsonify({
         'question': question,
         'response': response,
-        'chat_id': chat_history.id
+        'chat_id': chat_id
     }), 200
 
+def _ask_llama(question):
+    """Get a response from LlamaService, or None if it timed out."""
+    llama_service = get_llama_service()
+    future = _run_on_async_loop(lambda: llama_service.get_response(question))
+    try:
+        response = future.result(timeout=current_app.config['LLAMA_RESPONSE_TIMEOUT'])
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        return None
+    return response
+
+def _run_on_async_loop(make_coroutine):
+    """
+    Run a coroutine on the shared background event loop within this app's context.
+    
+    Args:
+        make_coroutine (callable): Returns the coroutine to run
+        
+    Returns:
+        concurrent.futures.Future: The coroutine's eventual result
+    """
+    app = current_app._get_current_object()
+    
+    async def _with_app_context():
+        # The background loop thread has no app context of its own
+        with app.app_context():
+            return await make_coroutine()
+    
+    return asyncio.run_coroutine_threadsafe(_with_app_context(), app.extensions['async_loop'])
+
+@chat_bp.route('/ask-question/stream', methods=['POST'])
+@swag_from({
+    'tags': ['Chat'],
+    'summary': 'Ask a question and stream the response',
+    'description': (
+        'Send a question to the chatbot and receive the response as server-sent events. '
+        'Each `message` event carries a `token`; a final `done` event carries the question, '
+        'full response and chat_id, or an `error` event reports a failure.'
+    ),
+    'security': [{'Bearer': []}],
+    'produces': ['text/event-stream'],
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'question': {'type': 'string', 'example': 'What are the key qualities of good leadership?'}
+                },
+                'required': ['question']
+            }
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Stream of chatbot response events'
+        },
+        400: {
+            'description': 'Invalid request',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            }
+        },
+        401: {
+            'description': 'Not authenticated',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            }
+        }
+    }
+})
+def ask_question_stream():
+    """Ask a question to the chatbot and stream the response."""
+    try:
+        validated_data = question_schema.loads(request.get_data(cache=False))
+    except ValidationError as err:
+        return jsonify({'error': err.messages}), 400
+    except ValueError:
+        return jsonify({'error': 'Request body must be valid JSON'}), 400
+    
+    question = sanitize_input(validated_data['question'])
+    
+    return Response(
+        stream_with_context(_stream_answer(current_user.id, question)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def _sse(data, event=None):
+    """Encode one server-sent event."""
+    prefix = f'event: {event}\n'.encode() if event else b''
+    return prefix + b'data: ' + orjson.dumps(data) + b'\n\n'
+
+def _stream_answer(user_id, question):
+    """Yield response events, then store the full answer once the stream ends."""
+    key = _answer_key(question)
+    with _answer_cache_lock:
+        response = _answer_cache.get(key)
+    
+    if response is not None:
+        yield _sse({'token': response})
+    else:
+        tokens = []
+        try:
+            for token in _stream_llama(question):
+                tokens.append(token)
+                yield _sse({'token': token})
+        except queue.Empty:
+            yield _sse({'error': 'The chatbot took too long to respond'}, 'error')
+            return
+        except Exception as e:
+            current_app.logger.error(f"Error streaming response: {str(e)}")
+            yield _sse({'error': ERROR_RESPONSE}, 'error')
+            return
+        
+        response = ''.join(tokens)
+        if response != ERROR_RESPONSE:
+            with _answer_cache_lock:
+                _answer_cache[key] = response
+    
+    # Store the question and the assembled response in chat history
+    chat_id = save_chat_history(user_id, question, response)
+    
+    yield _sse({
+        'question': question,
+        'response': response,
+        'chat_id': chat_id
+    }, 'done')
+
+# Marks the end of a response stream on the token queue
+_STREAM_END = object()
+
+def _stream_llama(question):
+    """
+    Yield response pieces from LlamaService as they are generated.
+    
+    Raises queue.Empty if no piece arrives within LLAMA_RESPONSE_TIMEOUT.
+    """
+    llama_service = get_llama_service()
+    tokens = queue.Queue()
+    
+    async def _produce():
+        try:
+            async for token in llama_service.stream_response(question):
+                tokens.put(token)
+        finally:
+            tokens.put(_STREAM_END)
+    
+    # Generate on the shared background event loop, handing pieces back here
+    future = _run_on_async_loop(_produce)
+    try:
+        while True:
+            token = tokens.get(timeout=current_app.config['LLAMA_RESPONSE_TIMEOUT'])
+            if token is _STREAM_END:
+                break
+            yield token
+        # Surface a failure that ended the stream early
+        future.result()
+    finally:
+        # Stop generating if the client went away or we gave up waiting
+        future.cancel()
+
 @chat_bp.route('/chat-history', methods=['GET'])
-@jwt_required()
 @swag_from({
     'tags': ['Chat'],
     'summary': 'Get user chat history',
@@ -177,7 +382,7 @@ def ask_question():
 })
 def get_chat_history():
     """Get chat history for the current user."""
-    user_id = get_jwt_identity()
+    user_id = g.jwt_identity
     
     # Get pagination parameters
     limit = request.args.get('limit', 10, type=int)
@@ -189,23 +394,44 @@ def get_chat_history():
     if offset < 0:
         offset = 0
     
-    # Query for chat history
-    chat_history = ChatHistory.query.filter_by(user_id=int(user_id))\
-        .order_by(ChatHistory.timestamp.desc())\
-        .limit(limit).offset(offset).all()
-    
-    # Get total count
-    total = ChatHistory.query.filter_by(user_id=int(user_id)).count()
+    chats, total = _chat_history_page(int(user_id), limit, offset)
     
     return jsonify({
-        'chat_history': [chat.to_dict() for chat in chat_history],
+        'chat_history': chats,
         'total': total,
         'limit': limit,
         'offset': offset
     }), 200
 
+def _chat_history_page(user_id, limit, offset):
+    """Fetch one page of a user's chat history and their total item count."""
+    # Fetch the page and the total count in a single round-trip, as plain
+    # column rows rather than ORM instances
+    rows = db.session.execute(
+        select(
+            ChatHistory.id,
+            ChatHistory.user_id,
+            ChatHistory.question,
+            ChatHistory.response,
+            ChatHistory.timestamp,
+            func.count().over().label('total')
+        )
+        .where(ChatHistory.user_id == user_id)
+        .order_by(ChatHistory.timestamp.desc())
+        .limit(limit).offset(offset)
+    ).mappings().all()
+    
+    chats = [dict(row) for row in rows]
+    for chat in chats:
+        total = chat.pop('total')
+    
+    if not chats:
+        # Past the last page there are no rows to carry the count
+        total = ChatHistory.query.filter_by(user_id=user_id).count() if offset else 0
+    
+    return chats, total
+
 @chat_bp.route('/chat-history/<int:chat_id>', methods=['GET'])
-@jwt_required()
 @swag_from({
     'tags': ['Chat'],
     'summary': 'Get specific chat item',
@@ -270,7 +496,7 @@ def get_chat_history():
 })
 def get_chat_item(chat_id):
     """Get a specific chat item by ID."""
-    user_id = get_jwt_identity()
+    user_id = g.jwt_identity
     
     # Find the chat item
     chat = ChatHistory.query.get(chat_id)
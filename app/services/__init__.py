@@ -1,2 +1,4 @@
 # Import services to make them available
-from app.services.llama_service import LlamaService 
\ No newline at end of file
+from app.services.llama_service import LlamaService 
+from app.services.history_writer import save_chat_history
+from app.services.semantic_cache import SemanticCache
\ No newline at end of file
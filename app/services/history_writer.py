@@ -0,0 +1,129 @@
+import concurrent.futures
+import queue
+import threading
+from flask import current_app
+from sqlalchemy import insert
+from app import db
+from app.models.chat_history import ChatHistory
+
+_writer_lock = threading.Lock()
+
+def save_chat_history(user_id, question, response):
+    """
+    Store a question and response in the user's chat history.
+
+    With CHAT_HISTORY_ASYNC_COMMIT enabled, the row is handed to the app's
+    writer thread, which inserts concurrent rows together and commits them as
+    a group. The id is returned as soon as the row's INSERT has run; its commit
+    then finishes in the background. If the writer doesn't pick the row up
+    within CHAT_HISTORY_WRITE_TIMEOUT seconds, it is written synchronously.
+
+    Args:
+        user_id (int): The owner of the chat item
+        question (str): The sanitized question
+        response (str): The chatbot's response
+
+    Returns:
+        int: The id of the new chat history row
+    """
+    if not current_app.config['CHAT_HISTORY_ASYNC_COMMIT']:
+        return _insert_now(user_id, question, response)
+
+    timeout = current_app.config['CHAT_HISTORY_WRITE_TIMEOUT']
+    inserted = concurrent.futures.Future()
+    _get_queue(current_app._get_current_object()).put((
+        {'user_id': user_id, 'question': question, 'response': response},
+        inserted
+    ))
+    try:
+        return inserted.result(timeout=timeout)
+    except concurrent.futures.TimeoutError:
+        # A row the writer hasn't claimed yet can be withdrawn and written here;
+        # once claimed, its INSERT is already underway
+        if not inserted.cancel():
+            return inserted.result(timeout=timeout)
+
+    current_app.logger.warning("Chat history writer is not keeping up; writing synchronously.")
+    return _insert_now(user_id, question, response)
+
+def _insert_now(user_id, question, response):
+    """Insert and commit a chat history row in the request's session."""
+    chat_history = ChatHistory(user_id=user_id, question=question, response=response)
+    db.session.add(chat_history)
+    db.session.commit()
+    return chat_history.id
+
+def _get_queue(app):
+    """Return the app's pending-row queue, (re)starting its writer thread if needed."""
+    with _writer_lock:
+        pending = app.extensions.get('chat_history_queue')
+        if pending is None:
+            pending = queue.Queue()
+            app.extensions['chat_history_queue'] = pending
+
+        writer = app.extensions.get('chat_history_writer')
+        if writer is None or not writer.is_alive():
+            writer = threading.Thread(
+                target=_write_batches,
+                args=(app, pending),
+                name='history-writer',
+                daemon=True
+            )
+            writer.start()
+            app.extensions['chat_history_writer'] = writer
+    return pending
+
+def _write_batches(app, pending):
+    """Insert queued rows in batches, publish their ids, then commit each batch."""
+    batch_size = app.config['CHAT_HISTORY_BATCH_SIZE']
+
+    while True:
+        batch = [pending.get()]
+        while len(batch) < batch_size:
+            try:
+                batch.append(pending.get_nowait())
+            except queue.Empty:
+                break
+
+        # Claim the rows; any whose request gave up waiting are skipped
+        batch = [(row, inserted) for row, inserted in batch if inserted.set_running_or_notify_cancel()]
+        if not batch:
+            continue
+
+        try:
+            _write_batch(app, batch)
+        except Exception as e:
+            app.logger.error(f"Error writing chat history: {str(e)}")
+            for _, inserted in batch:
+                if not inserted.done():
+                    inserted.set_exception(e)
+
+def _write_batch(app, batch):
+    """Insert one batch of claimed rows, resolve their futures and commit."""
+    with app.app_context():
+        try:
+            rows = [row for row, _ in batch]
+            if db.engine.dialect.insert_returning:
+                # One multi-row INSERT; ids come back in the order rows were queued
+                ids = db.session.scalars(
+                    insert(ChatHistory).returning(ChatHistory.id, sort_by_parameter_order=True),
+                    rows
+                ).all()
+            else:
+                # Without RETURNING (MySQL), each row's id comes from its own INSERT
+                chats = [ChatHistory(**row) for row in rows]
+                db.session.add_all(chats)
+                db.session.flush()
+                ids = [chat.id for chat in chats]
+        except Exception:
+            db.session.rollback()
+            raise
+
+        for chat_id, (_, inserted) in zip(ids, batch):
+            inserted.set_result(chat_id)
+
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error committing chat history {ids}: {str(e)}")
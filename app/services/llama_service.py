@@ -1,4 +1,3 @@
-import os
 from flask import current_app
 from llama_index.indices.managed.llama_cloud import LlamaCloudIndex
 from llama_index.core.prompts import ChatPromptTemplate, ChatMessage, MessageRole
@@ -6,91 +5,97 @@ from llama_index.llms.openai import OpenAI
 from llama_index.core.agent.workflow import FunctionAgent
 from llama_index.core.tools import QueryEngineTool
 from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.embeddings.openai import OpenAIEmbedding
+from app.services.semantic_cache import SemanticCache
 import asyncio
+import threading
+import httpx
+
+# Returned in place of an answer when the agent fails
+ERROR_RESPONSE = "I'm sorry, but I encountered an error while processing your question."
+
+SYSTEM_PROMPT = """You are a virtual mentor for a Leadership Skills, taught by Professor Vishal Gupta from IIM Ahmedabad. Your role is to provide comprehensive, accurate, and relevant answers to questions about leadership skills, Adhere to the following guidelines:
+
+1. **Exclusive Use of Course Content**: Use ONLY the information provided in the course transcripts. Do not use external knowledge or sources.
+2. **Accurate Reference**: Always include the relevant week and topic title(s) in your answer, formatting it as: [Week X: Topic Title].
+3. **Handling Unanswerable Questions**: If the question cannot be answered using the provided transcripts, state this clearly.
+4. **Strict Non-Inference Policy**: Do not infer information not explicitly stated in the provided content.
+5. **Structured and Clear Responses**: Ensure your responses are well-structured and directly quote from the transcript when appropriate.
+6. **Mentor-like Tone**: Phrase your responses as a supportive virtual mentor, offering guidance and insights based on the course material.
+7. **Comprehensive Answers**: Provide thorough answers, elaborating on key points and connecting ideas from different parts of the course when relevant.
+8. **Consistency**: Maintain consistency in style and adherence to the guidelines throughout your responses.
+
+Remember, accuracy and relevance to the provided course content are paramount."""
+
+# Connection pool shared by the OpenAI and LlamaCloud clients, so warm requests
+# reuse open TLS connections
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+_HTTP_TIMEOUT = 60
+
+# LlamaCloudRetriever search parameters for the course index: rerank 15 dense
+# candidates down to the 6 chunks passed to the LLM
+_RETRIEVER_KWARGS = {
+    "dense_similarity_top_k": 15,
+    "enable_reranking": True,
+    "rerank_top_n": 6,
+    "retrieval_mode": "chunks",
+}
 
 class LlamaService:
     """Service for handling interactions with LlamaCloudIndex."""
     
     _instance = None
+    _instance_lock = threading.Lock()
     
     @classmethod
     def get_instance(cls):
-        """Get or create a singleton instance of LlamaService."""
+        """Get or create a singleton instance of LlamaService on first use."""
         if cls._instance is None:
-            cls._instance = cls()
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
         return cls._instance
     
     def __init__(self):
-        """Initialize the LlamaCloudIndex service."""
-        pass
+        """Initialize the LlamaCloudIndex service; components are built on first use."""
+        self._init_lock = threading.Lock()
+        self._http_client = httpx.AsyncClient(limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+        self._index = None
+        self._retriever = None
+        self._llm = None
+        self._query_engine = None
+        self._streaming_query_engine = None
+        self._agent = None
+        
+        # Built by the first call when SEMANTIC_CACHE_ENABLED is set
+        self._semantic_cache = None
+        
+        # Request batching, started on the event loop by the first call
+        self._app = None
+        self._queue = None
+        self._batcher = None
+        self._batches = set()
+        self._concurrency = None
     
-    async def get_response(self, query):
+    def _ensure_initialized(self):
         """
-        Get a response from the agent for the given query.
+        Build the index, retriever, LLM, query engine and agent once.
         
-        Args:
-            query (str): The user's question
-            
-        Returns:
-            str: The response from the LLM
+        Must be called with an app context. If construction fails, nothing is
+        stored and the next call tries again.
         """
-        try:
-            # Set OpenAI API key from config
-            openai_api_key = current_app.config.get('OPENAI_API_KEY')
-            if openai_api_key:
-                os.environ["OPENAI_API_KEY"] = openai_api_key
-                current_app.logger.info("OpenAI API key set successfully.")
-                
-            # Using the specific values from the notebook for testing
-            # In production, these would come from environment variables
-            api_key = current_app.config.get('LLAMA_CLOUD_API_KEY')
-            index_name = current_app.config.get('LLAMA_CLOUD_INDEX_NAME')
-            project_name = current_app.config.get('LLAMA_CLOUD_PROJECT_NAME')
-            organization_id = current_app.config.get('LLAMA_CLOUD_ORGANIZATION_ID')
-            
-            # Setup system prompt
-            system_prompt = """You are a virtual mentor for a Leadership Skills, taught by Professor Vishal Gupta from IIM Ahmedabad. Your role is to provide comprehensive, accurate, and relevant answers to questions about leadership skills, Adhere to the following guidelines:
-
-            1. **Exclusive Use of Course Content**: Use ONLY the information provided in the course transcripts. Do not use external knowledge or sources.
-            2. **Accurate Reference**: Always include the relevant week and topic title(s) in your answer, formatting it as: [Week X: Topic Title].
-            3. **Handling Unanswerable Questions**: If the question cannot be answered using the provided transcripts, state this clearly.
-            4. **Strict Non-Inference Policy**: Do not infer information not explicitly stated in the provided content.
-            5. **Structured and Clear Responses**: Ensure your responses are well-structured and directly quote from the transcript when appropriate.
-            6. **Mentor-like Tone**: Phrase your responses as a supportive virtual mentor, offering guidance and insights based on the course material.
-            7. **Comprehensive Answers**: Provide thorough answers, elaborating on key points and connecting ideas from different parts of the course when relevant.
-            8. **Consistency**: Maintain consistency in style and adherence to the guidelines throughout your responses.
-
-            Remember, accuracy and relevance to the provided course content are paramount."""
-            
-            # Setup the LlamaCloudIndex
-            index = LlamaCloudIndex(
-                name=index_name,
-                project_name=project_name,
-                organization_id=organization_id,
-                api_key=api_key,
-            )
-            current_app.logger.info("LlamaCloudIndex initialized successfully.")
-            
-            # Initialize the retriever with specific search parameters
-            retriever = index.as_retriever(
-                search_type="default",
-                search_kwargs={
-                    "similarity_top_k": 30,
-                    "node_types": ["chunk"],
-                    "rerank": True,
-                    "rerank_top_n": 6,
-                    "filter_mode": "accurate",
-                    "multimodal": False,
-                    "filter_condition": {
-                        "operator": "AND",
-                        "filters": []  # Add metadata filters if needed
-                    }
-                }
-            )
+        if self._agent is not None:
+            return
+        
+        with self._init_lock:
+            if self._agent is not None:
+                return
+            
+            index, retriever = self._build_retriever()
             
             # Setup custom prompt template
             message_templates = [
-                ChatMessage(role=MessageRole.SYSTEM, content=system_prompt),
+                ChatMessage(role=MessageRole.SYSTEM, content=SYSTEM_PROMPT),
                 ChatMessage(
                     role=MessageRole.USER,
                     content=(
@@ -105,8 +110,14 @@ class LlamaService:
             ]
             custom_prompt = ChatPromptTemplate(message_templates=message_templates)
             
-            # Initialize LLM
-            llm = OpenAI(model="gpt-4o", temperature=0.1)
+            # Initialize LLM with the key from config rather than the process
+            # environment
+            llm = OpenAI(
+                model="gpt-4o",
+                temperature=0.1,
+                api_key=current_app.config.get('OPENAI_API_KEY') or None,
+                async_http_client=self._http_client,
+            )
             
             # Create query engine
             query_engine = RetrieverQueryEngine.from_args(
@@ -116,6 +127,17 @@ class LlamaService:
                 chain_of_thought=True,
             )
             
+            # Streaming variant for token-by-token answers. The agent's tool
+            # returns the query engine's answer directly, so streaming can query
+            # the engine without going through the agent
+            streaming_query_engine = RetrieverQueryEngine.from_args(
+                retriever=retriever,
+                llm=llm,
+                prompt=custom_prompt,
+                chain_of_thought=True,
+                streaming=True,
+            )
+            
             # Create query engine tool
             query_engine_tool = QueryEngineTool.from_defaults(
                 query_engine=query_engine,
@@ -130,22 +152,215 @@ class LlamaService:
                 description="You are a virtual mentor for a Leadership Skills course, providing accurate answers using only the course content.",
                 tools=[query_engine_tool],
                 llm=llm,
-                system_prompt=system_prompt,
+                system_prompt=SYSTEM_PROMPT,
             )
-            
             current_app.logger.info("Agent initialized successfully.")
             
-            # Create a new event loop and run the agent within it
+            self._index = index
+            self._retriever = retriever
+            self._llm = llm
+            self._query_engine = query_engine
+            self._streaming_query_engine = streaming_query_engine
+            self._agent = agent
+    
+    def _build_retriever(self):
+        """
+        Connect to the LlamaCloudIndex and create its retriever.
+        
+        Returns:
+            tuple: (index, retriever)
+        """
+        index = LlamaCloudIndex(
+            name=current_app.config.get('LLAMA_CLOUD_INDEX_NAME'),
+            project_name=current_app.config.get('LLAMA_CLOUD_PROJECT_NAME'),
+            organization_id=current_app.config.get('LLAMA_CLOUD_ORGANIZATION_ID'),
+            api_key=current_app.config.get('LLAMA_CLOUD_API_KEY'),
+            async_httpx_client=self._http_client,
+        )
+        current_app.logger.info("LlamaCloudIndex initialized successfully.")
+        
+        retriever = index.as_retriever(**_RETRIEVER_KWARGS)
+        return index, retriever
+    
+    async def get_response(self, query):
+        """
+        Get a response from the agent for the given query.
+        
+        Questions similar enough to an earlier one are answered from the
+        semantic cache. Others are queued and dispatched in small batches, so
+        bursts of concurrent requests reach the backends together.
+        
+        Args:
+            query (str): The user's question
+            
+        Returns:
+            str: The response from the LLM
+        """
+        embedding, response = await self._cached_response(query)
+        if response is not None:
+            return response
+        
+        if self._queue is None:
+            self._start_batcher()
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, future))
+        response = await future
+        
+        if embedding is not None and response != ERROR_RESPONSE:
+            self._semantic_cache.insert(embedding, response)
+        return response
+    
+    async def stream_response(self, query):
+        """
+        Stream a response for the given query as the LLM generates it.
+        
+        Questions similar enough to an earlier one are answered from the
+        semantic cache in a single piece.
+        
+        Args:
+            query (str): The user's question
+            
+        Yields:
+            str: Successive pieces of the response
+        """
+        embedding, response = await self._cached_response(query)
+        if response is not None:
+            yield response
+            return
+        
+        if self._concurrency is None:
+            self._start_batcher()
+        
+        tokens = []
+        try:
+            # Streams share the LLAMA_CONCURRENCY cap with batched questions,
+            # holding a slot until the answer has been generated
+            async with self._concurrency:
+                if self._agent is None:
+                    # Construction makes blocking network calls; keep it off the event loop
+                    await asyncio.to_thread(self._ensure_initialized)
+                
+                streaming_response = await self._streaming_query_engine.aquery(query)
+                async for token in streaming_response.async_response_gen():
+                    tokens.append(token)
+                    yield token
+                
+        except Exception as e:
+            current_app.logger.error(f"Error in LlamaService: {str(e)}")
+            # A partial answer can't be replaced, so let the caller handle it
+            if tokens:
+                raise
+            yield ERROR_RESPONSE
+            return
+        
+        if embedding is not None:
+            self._semantic_cache.insert(embedding, ''.join(tokens))
+    
+    async def _cached_response(self, query):
+        """
+        Look up the semantic cache for an answer to a similar earlier question.
+        
+        Args:
+            query (str): The user's question
             
+        Returns:
+            tuple: (embedding, response) - the question's embedding for caching
+            the new answer, or None if the cache is disabled or unavailable; and
+            the cached response, or None on a miss
+        """
+        cache = self._get_semantic_cache()
+        if cache is None:
+            return None, None
+        
+        try:
+            embedding = await cache.embed(query)
+        except Exception as e:
+            current_app.logger.warning(f"Semantic cache lookup skipped: {str(e)}")
+            return None, None
+        
+        return embedding, cache.lookup(embedding)
+    
+    def _get_semantic_cache(self):
+        """Return the semantic cache, creating it on first use, or None if disabled."""
+        config = current_app.config
+        if not config['SEMANTIC_CACHE_ENABLED']:
+            return None
+        
+        if self._semantic_cache is None:
+            self._semantic_cache = SemanticCache(
+                OpenAIEmbedding(
+                    model="text-embedding-3-small",
+                    api_key=config.get('OPENAI_API_KEY') or None,
+                    async_http_client=self._http_client,
+                ),
+                threshold=config['SEMANTIC_CACHE_THRESHOLD'],
+                maxsize=config['SEMANTIC_CACHE_SIZE'],
+            )
+        return self._semantic_cache
+    
+    def _start_batcher(self):
+        """Start the batch worker on the running event loop."""
+        self._app = current_app._get_current_object()
+        self._queue = asyncio.Queue()
+        self._concurrency = asyncio.Semaphore(self._app.config['LLAMA_CONCURRENCY'])
+        self._batcher = asyncio.get_running_loop().create_task(self._batch_worker())
+    
+    async def _batch_worker(self):
+        """Collect queued questions for a short window and dispatch them together."""
+        loop = asyncio.get_running_loop()
+        batch_size = self._app.config['LLAMA_BATCH_SIZE']
+        batch_window = self._app.config['LLAMA_BATCH_WINDOW_MS'] / 1000
+        
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + batch_window
+            while len(batch) < batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
             
-            response = await agent.run(query)
+            # Dispatch without waiting, so a slow batch doesn't hold up the next one
+            task = loop.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+    
+    async def _run_batch(self, batch):
+        """Answer a batch of queued questions concurrently."""
+        async def _answer(query, future):
+            # Skip questions whose caller has given up waiting, both before and
+            # after waiting for a concurrency slot
+            if future.done():
+                return
+            async with self._concurrency:
+                if future.done():
+                    return
+                with self._app.app_context():
+                    response = await self._run_agent(query)
+            if not future.done():
+                future.set_result(response)
+        
+        await asyncio.gather(*(_answer(query, future) for query, future in batch))
+    
+    async def _run_agent(self, query):
+        """Run the agent for one question, returning the error message on failure."""
+        try:
+            if self._agent is None:
+                # Construction makes blocking network calls; keep it off the event loop
+                await asyncio.to_thread(self._ensure_initialized)
+            
+            response = await self._agent.run(query)
             return str(response)
                 
         except Exception as e:
             current_app.logger.error(f"Error in LlamaService: {str(e)}")
-            return "I'm sorry, but I encountered an error while processing your question."
+            return ERROR_RESPONSE
     
-    def retrieve_context(self, query):
+    async def retrieve_context(self, query):
         """
         Retrieve context from LlamaCloudIndex for the given query.
         
@@ -156,50 +371,44 @@ class LlamaService:
             list: List of retrieved nodes
         """
         try:
-            # Set OpenAI API key from config
-            openai_api_key = current_app.config.get('OPENAI_API_KEY')
-            if openai_api_key:
-                os.environ["OPENAI_API_KEY"] = openai_api_key
-            
-            # Using the specific values from the notebook for testing
-            api_key = current_app.config.get('LLAMA_CLOUD_API_KEY')
-            index_name = current_app.config.get('LLAMA_CLOUD_INDEX_NAME')
-            project_name = current_app.config.get('LLAMA_CLOUD_PROJECT_NAME')
-            organization_id = current_app.config.get('LLAMA_CLOUD_ORGANIZATION_ID')
-            
-            # Setup the LlamaCloudIndex
-            index = LlamaCloudIndex(
-                name=index_name,
-                project_name=project_name,
-                organization_id=organization_id,
-                api_key=api_key,
-            )
-            
-            # Initialize the retriever
-            retriever = index.as_retriever(
-                search_type="default",
-                search_kwargs={
-                    "similarity_top_k": 30,
-                    "node_types": ["chunk"],
-                    "rerank": True,
-                    "rerank_top_n": 6,
-                    "filter_mode": "accurate",
-                    "multimodal": False,
-                    "filter_condition": {
-                        "operator": "AND",
-                        "filters": []
-                    }
-                }
-            )
+            if self._retriever is None:
+                # Construction makes blocking network calls; keep it off the event loop
+                await asyncio.to_thread(self._ensure_initialized)
             
-            # Use the retriever directly to get context
-            nodes = retriever.retrieve(query)
-            return nodes
+            # Use the cached retriever directly to get context
+            return await self._retriever.aretrieve(query)
             
         except Exception as e:
             current_app.logger.error(f"Error retrieving context: {str(e)}")
             return []
 
+    async def _warmup(self):
+        """Build the components and open pooled connections ahead of the first question."""
+        try:
+            await asyncio.to_thread(self._ensure_initialized)
+            await self._retriever.aretrieve("leadership")
+            current_app.logger.info("LlamaService warmed up.")
+        except Exception as e:
+            current_app.logger.warning(f"LlamaService warmup failed: {str(e)}")
+
 # Factory function to get the LlamaService instance
 def get_llama_service():
-    return LlamaService.get_instance()
\ No newline at end of file
+    return LlamaService.get_instance()
+
+def warm_up_llama_service(app):
+    """
+    Start warming up the LlamaService on the app's event loop without waiting.
+    
+    Args:
+        app (Flask): The application whose config and event loop to use
+        
+    Returns:
+        concurrent.futures.Future: Completes when the warmup has finished
+    """
+    llama_service = get_llama_service()
+    
+    async def _warmup():
+        with app.app_context():
+            await llama_service._warmup()
+    
+    return asyncio.run_coroutine_threadsafe(_warmup(), app.extensions['async_loop'])
\ No newline at end of file
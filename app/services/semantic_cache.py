@@ -0,0 +1,84 @@
+import threading
+import numpy as np
+
+class SemanticCache:
+    """
+    In-memory cache of responses keyed by question embedding.
+
+    A lookup returns the response cached for the most similar earlier question
+    when the cosine similarity reaches the threshold, so rephrasings of a
+    recurring question are answered without the LLM. Entries are evicted least
+    recently used first. Embeddings are unit-normalized, so similarity is a
+    single matrix-vector product over at most `maxsize` rows.
+    """
+
+    def __init__(self, embed_model, threshold=0.92, maxsize=1000):
+        self._embed_model = embed_model
+        self._threshold = threshold
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._embeddings = None
+        self._responses = [None] * maxsize
+        self._last_used = np.zeros(maxsize, dtype=np.int64)
+        self._size = 0
+        self._clock = 0
+
+    async def embed(self, text):
+        """
+        Embed a question for lookup and insertion.
+
+        Args:
+            text (str): The sanitized question
+
+        Returns:
+            numpy.ndarray: The unit-length float32 embedding
+        """
+        vector = await self._embed_model.aget_query_embedding(text.strip().lower())
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def lookup(self, embedding):
+        """
+        Find the cached response for the closest earlier question.
+
+        Args:
+            embedding (numpy.ndarray): The question embedding from `embed`
+
+        Returns:
+            str: The cached response, or None if nothing is similar enough
+        """
+        with self._lock:
+            if not self._size:
+                return None
+
+            similarities = self._embeddings[:self._size] @ embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] < self._threshold:
+                return None
+
+            self._clock += 1
+            self._last_used[best] = self._clock
+            return self._responses[best]
+
+    def insert(self, embedding, response):
+        """
+        Cache a response under its question embedding.
+
+        Args:
+            embedding (numpy.ndarray): The question embedding from `embed`
+            response (str): The response to return for similar questions
+        """
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = np.zeros((self._maxsize, embedding.shape[0]), dtype=np.float32)
+
+            if self._size < self._maxsize:
+                slot = self._size
+                self._size += 1
+            else:
+                slot = int(np.argmin(self._last_used))
+
+            self._clock += 1
+            self._embeddings[slot] = embedding
+            self._responses[slot] = response
+            self._last_used[slot] = self._clock
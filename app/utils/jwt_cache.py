@@ -0,0 +1,40 @@
+import hashlib
+import threading
+import time
+from cachetools import TLRUCache
+from flask_jwt_extended import JWTManager
+
+class CachingJWTManager(JWTManager):
+    """JWTManager that remembers verified token payloads for a few seconds.
+
+    Repeated requests with the same token skip signature verification.
+    Entries never outlive the token's own expiry, and the short TTL keeps
+    the window small for anything that invalidates a token early.
+    """
+
+    def __init__(self, app=None, ttl=10, maxsize=10000, **kwargs):
+        self._payload_ttl = ttl
+        self._payload_cache = TLRUCache(maxsize=maxsize, ttu=self._time_to_use)
+        self._payload_lock = threading.Lock()
+        super().__init__(app, **kwargs)
+
+    def _time_to_use(self, _key, payload, now):
+        """Expire cached payloads after the TTL or at token expiry, whichever is first."""
+        ttl = self._payload_ttl
+        if 'exp' in payload:
+            ttl = min(ttl, payload['exp'] - time.time())
+        return now + ttl
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        # CSRF checks and expired-token decoding depend on more than the token itself
+        if csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+
+        key = hashlib.sha256(encoded_token.encode()).digest()
+        with self._payload_lock:
+            payload = self._payload_cache.get(key)
+        if payload is None:
+            payload = super()._decode_jwt_from_config(encoded_token)
+            with self._payload_lock:
+                self._payload_cache[key] = payload
+        return dict(payload)
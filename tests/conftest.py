@@ -0,0 +1,120 @@
+import pytest
+from unittest.mock import patch
+from sqlalchemy import event
+from flask_sqlalchemy.session import Session
+from app import create_app, db
+from app.routes import auth, chat
+
+class _ConnectionSession(Session):
+    """Session pinned to the connection holding the current test's transaction."""
+    
+    def get_bind(self, *args, **kwargs):
+        return self.bind
+
+class FakeEmbedding:
+    """Embedding model returning fixed vectors by question, or `default` for any other."""
+    
+    def __init__(self, vectors=None, default=None):
+        self.vectors = vectors or {}
+        self.default = default
+    
+    async def aget_query_embedding(self, text):
+        return self.vectors.get(text, self.default)
+
+@pytest.fixture
+def fake_embedding():
+    """The FakeEmbedding class, for building embedding models with known vectors."""
+    return FakeEmbedding
+
+@pytest.fixture(scope='session', autouse=True)
+def _agent_mock():
+    """Stand in for the agent for the whole run, so no test reaches the LLM."""
+    # Patching the agent call rather than get_response keeps the service's own
+    # caching and batching under test
+    with patch('app.services.llama_service.LlamaService._run_agent') as mock:
+        yield mock
+
+@pytest.fixture(autouse=True)
+def llm(_agent_mock):
+    """The agent stand-in, reset for each test; set `return_value` to change its answer."""
+    _agent_mock.reset_mock()
+    _agent_mock.return_value = "This is a test response."
+    return _agent_mock
+
+@pytest.fixture(scope='session')
+def _app():
+    """Create the app and its schema once for the whole test run."""
+    app = create_app('testing')
+    
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite':
+            # pysqlite defers BEGIN, so releasing a SAVEPOINT would commit;
+            # emit BEGIN explicitly so each test's transaction can roll back
+            @event.listens_for(engine, 'connect')
+            def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+                dbapi_connection.isolation_level = None
+            
+            @event.listens_for(engine, 'begin')
+            def _begin(connection):
+                connection.exec_driver_sql('BEGIN')
+            
+            # Reconnect so the listeners apply to the connection in use
+            engine.dispose()
+        db.create_all()
+    
+    yield app
+    
+    with app.app_context():
+        db.drop_all()
+
+@pytest.fixture
+def client(_app):
+    """Test client whose database changes are rolled back after each test."""
+    chat._answer_cache.clear()
+    auth._verified_logins.clear()
+    
+    with _app.app_context():
+        connection = db.engine.connect()
+        transaction = connection.begin()
+        
+        # Commits in the app release a SAVEPOINT inside the test's transaction
+        session = db.session
+        db.session = db._make_scoped_session({
+            'class_': _ConnectionSession,
+            'bind': connection,
+            'join_transaction_mode': 'create_savepoint'
+        })
+        
+        try:
+            with _app.test_client() as client:
+                yield client
+        finally:
+            db.session.remove()
+            db.session = session
+            transaction.rollback()
+            connection.close()
+
+@pytest.fixture(scope='session')
+def auth_headers(_app):
+    """Sign up and log in one user for the whole run, returning its auth headers."""
+    # Runs outside any test's transaction, so the user outlives the rollbacks;
+    # its username differs from the ones the auth tests create
+    with _app.test_client() as client:
+        client.post(
+            '/api/signup',
+            json={
+                'username': 'chatuser',
+                'email': 'chatuser@example.com',
+                'password': 'Test@123'
+            }
+        )
+        response = client.post(
+            '/api/login',
+            json={
+                'username': 'chatuser',
+                'password': 'Test@123'
+            }
+        )
+    
+    return {'Authorization': f'Bearer {response.get_json()["access_token"]}'}
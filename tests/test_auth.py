@@ -1,91 +1,129 @@
-import json
 import pytest
-from app import create_app, db
+from unittest.mock import patch
+from app import bcrypt, db
 from app.models.user import User
-
-@pytest.fixture
-def client():
-    app = create_app('testing')
-    
-    with app.test_client() as client:
-        with app.app_context():
-            db.create_all()
-            yield client
-            db.session.remove()
-            db.drop_all()
+from app.routes import auth
 
 def test_signup(client):
     """Test user registration."""
     response = client.post(
         '/api/signup',
-        data=json.dumps({
+        json={
             'username': 'testuser',
             'email': 'test@example.com',
             'password': 'Test@123'
-        }),
-        content_type='application/json'
+        }
     )
     
     assert response.status_code == 201
-    data = json.loads(response.data)
+    data = response.get_json()
     assert 'user' in data
     assert data['user']['username'] == 'testuser'
     assert data['user']['email'] == 'test@example.com'
 
+def test_signup_ignores_unknown_fields(client):
+    """Test that unknown fields in the signup payload are ignored."""
+    response = client.post(
+        '/api/signup',
+        json={
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password': 'Test@123',
+            'role': 'admin'
+        }
+    )
+    
+    assert response.status_code == 201
+
+def test_signup_invalid_json(client):
+    """Test signup with a malformed request body."""
+    response = client.post(
+        '/api/signup',
+        data='{"username": "testuser",',
+        content_type='application/json'
+    )
+    
+    assert response.status_code == 400
+    data = response.get_json()
+    assert 'error' in data
+
 def test_signup_existing_username(client):
     """Test signup with an existing username."""
     # First create a user
     client.post(
         '/api/signup',
-        data=json.dumps({
+        json={
             'username': 'testuser',
             'email': 'test1@example.com',
             'password': 'Test@123'
-        }),
-        content_type='application/json'
+        }
     )
     
     # Try to create another user with the same username
     response = client.post(
         '/api/signup',
-        data=json.dumps({
+        json={
             'username': 'testuser',
             'email': 'test2@example.com',
             'password': 'Test@123'
-        }),
-        content_type='application/json'
+        }
     )
     
     assert response.status_code == 409
-    data = json.loads(response.data)
+    data = response.get_json()
     assert 'error' in data
     assert 'Username already exists' in data['error']
 
+def test_signup_existing_email(client):
+    """Test signup with an existing email."""
+    # First create a user
+    client.post(
+        '/api/signup',
+        json={
+            'username': 'testuser1',
+            'email': 'test@example.com',
+            'password': 'Test@123'
+        }
+    )
+    
+    # Try to create another user with the same email
+    response = client.post(
+        '/api/signup',
+        json={
+            'username': 'testuser2',
+            'email': 'test@example.com',
+            'password': 'Test@123'
+        }
+    )
+    
+    assert response.status_code == 409
+    data = response.get_json()
+    assert 'error' in data
+    assert 'Email already exists' in data['error']
+
 def test_login(client):
     """Test user login."""
     # First create a user
     client.post(
         '/api/signup',
-        data=json.dumps({
+        json={
             'username': 'testuser',
             'email': 'test@example.com',
             'password': 'Test@123'
-        }),
-        content_type='application/json'
+        }
     )
     
     # Login with the created user
     response = client.post(
         '/api/login',
-        data=json.dumps({
+        json={
             'username': 'testuser',
             'password': 'Test@123'
-        }),
-        content_type='application/json'
+        }
     )
     
     assert response.status_code == 200
-    data = json.loads(response.data)
+    data = response.get_json()
     assert 'access_token' in data
     assert 'refresh_token' in data
     assert 'user' in data
@@ -96,25 +134,102 @@ def test_login_invalid_credentials(client):
     # First create a user
     client.post(
         '/api/signup',
-        data=json.dumps({
+        json={
             'username': 'testuser',
             'email': 'test@example.com',
             'password': 'Test@123'
-        }),
-        content_type='application/json'
+        }
     )
     
     # Try to login with wrong password
     response = client.post(
         '/api/login',
-        data=json.dumps({
+        json={
             'username': 'testuser',
             'password': 'WrongPassword'
-        }),
-        content_type='application/json'
+        }
     )
     
     assert response.status_code == 401
-    data = json.loads(response.data)
+    data = response.get_json()
     assert 'error' in data
-    assert 'Invalid credentials' in data['error'] 
\ No newline at end of file
+    assert 'Invalid credentials' in data['error']
+
+def test_get_current_user(client):
+    """Test fetching the current user repeatedly with the same token."""
+    response = _signup_and_login(client)
+    headers = {'Authorization': f'Bearer {response.get_json()["access_token"]}'}
+    
+    # The second call is served from the cached user snapshot
+    for _ in range(2):
+        response = client.get('/api/me', headers=headers)
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['user']['username'] == 'testuser'
+        assert data['user']['email'] == 'test@example.com'
+
+def test_get_current_user_deleted(client):
+    """Test that a valid token for a deleted user reports the user as not found."""
+    response = _signup_and_login(client)
+    headers = {'Authorization': f'Bearer {response.get_json()["access_token"]}'}
+    
+    with client.application.app_context():
+        db.session.delete(User.query.filter_by(username='testuser').first())
+        db.session.commit()
+    
+    response = client.get('/api/me', headers=headers)
+    
+    assert response.status_code == 404
+    assert response.get_json()['error'] == 'User not found'
+
+def _signup_and_login(client, password='Test@123'):
+    """Create the test user and log in once, returning the login response."""
+    client.post(
+        '/api/signup',
+        json={
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password': 'Test@123'
+        }
+    )
+    return client.post('/api/login', json={'username': 'testuser', 'password': password})
+
+def test_login_repeat_skips_password_check(client):
+    """Test that a repeated login within the cache TTL skips bcrypt."""
+    with patch.object(bcrypt, 'check_password_hash', wraps=bcrypt.check_password_hash) as check:
+        assert _signup_and_login(client).status_code == 200
+        response = client.post('/api/login', json={'username': 'testuser', 'password': 'Test@123'})
+    
+    assert response.status_code == 200
+    assert check.call_count == 1
+
+def test_login_rechecks_changed_password_hash(client):
+    """Test that a cached login is not reused once the password has changed."""
+    assert _signup_and_login(client).status_code == 200
+    
+    with client.application.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        user.password_hash = bcrypt.generate_password_hash('New@1234').decode('utf-8')
+        db.session.commit()
+    
+    with patch.object(bcrypt, 'check_password_hash', wraps=bcrypt.check_password_hash) as check:
+        response = client.post('/api/login', json={'username': 'testuser', 'password': 'Test@123'})
+    
+    assert response.status_code == 401
+    assert check.call_count == 1
+
+def test_login_failures_are_not_cached(client):
+    """Test that failed logins always run the password check."""
+    with patch.object(bcrypt, 'check_password_hash', wraps=bcrypt.check_password_hash) as check:
+        assert _signup_and_login(client, password='Wrong@123').status_code == 401
+        response = client.post('/api/login', json={'username': 'testuser', 'password': 'Wrong@123'})
+    
+    assert response.status_code == 401
+    assert check.call_count == 2
+    assert len(auth._verified_logins) == 0
+
+def test_login_does_not_need_secret_key(client):
+    """Test that login works when SECRET_KEY is unset."""
+    with patch.dict(client.application.config, {'SECRET_KEY': None}):
+        assert _signup_and_login(client).status_code == 200
@@ -1,76 +1,119 @@
 import json
 import pytest
 from unittest.mock import patch
-from app import create_app, db
+from sqlalchemy.exc import OperationalError
+from app import db
 from app.models.user import User
 from app.models.chat_history import ChatHistory
 
-@pytest.fixture
-def client():
-    app = create_app('testing')
-    
-    with app.test_client() as client:
-        with app.app_context():
-            db.create_all()
-            yield client
-            db.session.remove()
-            db.drop_all()
+def test_chat_routes_require_auth(client):
+    """Test that chat routes reject requests without a JWT."""
+    for response in [
+        client.post('/api/ask-question', json={'question': 'Hi'}),
+        client.get('/api/chat-history'),
+        client.get('/api/chat-history/1')
+    ]:
+        assert response.status_code == 401
+        data = response.get_json()
+        assert data['error'] == 'Authorization required'
 
-@pytest.fixture
-def auth_headers(client):
-    """Create a user and get auth headers with JWT token."""
-    # Register a user
-    client.post(
-        '/api/signup',
-        data=json.dumps({
-            'username': 'testuser',
-            'email': 'test@example.com',
-            'password': 'Test@123'
-        }),
-        content_type='application/json'
-    )
-    
-    # Login to get tokens
-    response = client.post(
-        '/api/login',
-        data=json.dumps({
-            'username': 'testuser',
-            'password': 'Test@123'
-        }),
-        content_type='application/json'
-    )
-    
-    data = json.loads(response.data)
-    return {'Authorization': f'Bearer {data["access_token"]}'}
+def test_chat_routes_allow_cors_preflight(client):
+    """Test that CORS preflight requests pass without a JWT."""
+    for url in ['/api/ask-question', '/api/ask-question/stream', '/api/chat-history', '/api/chat-history/1']:
+        response = client.options(
+            url,
+            headers={
+                'Origin': 'http://example.com',
+                'Access-Control-Request-Method': 'POST',
+                'Access-Control-Request-Headers': 'Authorization, Content-Type'
+            }
+        )
+        
+        assert response.status_code == 200
+        assert response.headers['Access-Control-Allow-Origin'] == 'http://example.com'
 
-@patch('app.services.llama_service.LlamaService.get_response')
-def test_ask_question(mock_get_response, client, auth_headers):
+def test_ask_question(client, auth_headers, llm):
     """Test asking a question to the chatbot."""
-    mock_get_response.return_value = "This is a test response from the leadership chatbot."
+    llm.return_value = "This is a test response from the leadership chatbot."
     
     response = client.post(
         '/api/ask-question',
-        data=json.dumps({
+        json={
             'question': 'What makes a good leader?'
-        }),
-        content_type='application/json',
+        },
         headers=auth_headers
     )
     
     assert response.status_code == 200
-    data = json.loads(response.data)
+    data = response.get_json()
     assert data['question'] == 'What makes a good leader?'
     assert data['response'] == "This is a test response from the leadership chatbot."
     assert 'chat_id' in data
     
     # Verify that the chat history was saved to the database
     with client.application.app_context():
-        user = User.query.filter_by(username='testuser').first()
+        user = User.query.filter_by(username='chatuser').first()
         chat = ChatHistory.query.filter_by(user_id=user.id).first()
         assert chat is not None
         assert chat.question == 'What makes a good leader?'
         assert chat.response == "This is a test response from the leadership chatbot."
 
+def test_ask_question_repeated(client, auth_headers, llm):
+    """Test that a repeated question is answered from the cache."""
+    llm.return_value = "This is a cached response."
+    
+    for question in ['What makes a good leader?', '  what makes a GOOD leader?']:
+        response = client.post(
+            '/api/ask-question',
+            json={
+                'question': question
+            },
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['response'] == "This is a cached response."
+    
+    assert llm.call_count == 1
+    
+    # Both questions are still recorded in the user's history
+    response = client.get(
+        '/api/chat-history',
+        headers=auth_headers
+    )
+    assert response.get_json()['total'] == 2
+
+@patch('app.services.llama_service.LlamaService.stream_response')
+def test_ask_question_stream(mock_stream_response, client, auth_headers):
+    """Test streaming a response and saving it once the stream ends."""
+    async def _tokens(query):
+        for token in ['Lead ', 'by ', 'example.']:
+            yield token
+    mock_stream_response.side_effect = _tokens
+    
+    response = client.post(
+        '/api/ask-question/stream',
+        json={
+            'question': 'What makes a good leader?'
+        },
+        headers=auth_headers
+    )
+    
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    events = response.get_data(as_text=True).strip().split('\n\n')
+    assert [json.loads(e[len('data: '):])['token'] for e in events[:-1]] == ['Lead ', 'by ', 'example.']
+    
+    event, data = events[-1].split('\n')
+    assert event == 'event: done'
+    data = json.loads(data[len('data: '):])
+    assert data['response'] == 'Lead by example.'
+    
+    with client.application.app_context():
+        chat = db.session.get(ChatHistory, data['chat_id'])
+        assert chat.response == 'Lead by example.'
+
 def test_get_chat_history_empty(client, auth_headers):
     """Test getting empty chat history."""
     response = client.get(
@@ -79,33 +122,28 @@ def test_get_chat_history_empty(client, auth_headers):
     )
     
     assert response.status_code == 200
-    data = json.loads(response.data)
+    data = response.get_json()
     assert 'chat_history' in data
     assert len(data['chat_history']) == 0
     assert data['total'] == 0
 
-@patch('app.services.llama_service.LlamaService.get_response')
-def test_get_chat_history(mock_get_response, client, auth_headers):
+def test_get_chat_history(client, auth_headers):
     """Test getting chat history after asking questions."""
-    mock_get_response.return_value = "This is a test response."
-    
     # Ask a question
     client.post(
         '/api/ask-question',
-        data=json.dumps({
+        json={
             'question': 'Question 1'
-        }),
-        content_type='application/json',
+        },
         headers=auth_headers
     )
     
     # Ask another question
     client.post(
         '/api/ask-question',
-        data=json.dumps({
+        json={
             'question': 'Question 2'
-        }),
-        content_type='application/json',
+        },
         headers=auth_headers
     )
     
@@ -116,7 +154,7 @@ def test_get_chat_history(mock_get_response, client, auth_headers):
     )
     
     assert response.status_code == 200
-    data = json.loads(response.data)
+    data = response.get_json()
     assert 'chat_history' in data
     assert len(data['chat_history']) == 2
     assert data['total'] == 2
@@ -125,22 +163,61 @@ def test_get_chat_history(mock_get_response, client, auth_headers):
     assert data['chat_history'][0]['question'] == 'Question 2'
     assert data['chat_history'][1]['question'] == 'Question 1'
 
-@patch('app.services.llama_service.LlamaService.get_response')
-def test_get_specific_chat_item(mock_get_response, client, auth_headers):
-    """Test getting a specific chat item."""
-    mock_get_response.return_value = "This is a test response."
+def test_get_chat_history_database_error(client, auth_headers):
+    """Test that a failing history query returns an error status, not a truncated body."""
+    error = OperationalError('SELECT', {}, Exception('database is unavailable'))
+    
+    with patch.dict(client.application.config, {'PROPAGATE_EXCEPTIONS': False}), \
+            patch.object(db.session, 'execute', side_effect=error):
+        response = client.get(
+            '/api/chat-history',
+            headers=auth_headers
+        )
+    
+    assert response.status_code == 500
+
+def test_get_chat_history_pagination(client, auth_headers):
+    """Test that paging reports the total count across pages."""
+    for i in range(3):
+        client.post(
+            '/api/ask-question',
+            json={
+                'question': f'Question {i}'
+            },
+            headers=auth_headers
+        )
+    
+    response = client.get(
+        '/api/chat-history?limit=2',
+        headers=auth_headers
+    )
     
+    data = response.get_json()
+    assert len(data['chat_history']) == 2
+    assert data['total'] == 3
+    
+    # Past the last page the total is still reported
+    response = client.get(
+        '/api/chat-history?offset=5',
+        headers=auth_headers
+    )
+    
+    data = response.get_json()
+    assert len(data['chat_history']) == 0
+    assert data['total'] == 3
+
+def test_get_specific_chat_item(client, auth_headers):
+    """Test getting a specific chat item."""
     # Ask a question
     response = client.post(
         '/api/ask-question',
-        data=json.dumps({
+        json={
             'question': 'Test question'
-        }),
-        content_type='application/json',
+        },
         headers=auth_headers
     )
     
-    chat_id = json.loads(response.data)['chat_id']
+    chat_id = response.get_json()['chat_id']
     
     # Get specific chat item
     response = client.get(
@@ -149,7 +226,7 @@ def test_get_specific_chat_item(mock_get_response, client, auth_headers):
     )
     
     assert response.status_code == 200
-    data = json.loads(response.data)
+    data = response.get_json()
     assert 'chat' in data
     assert data['chat']['id'] == chat_id
     assert data['chat']['question'] == 'Test question'
@@ -0,0 +1,102 @@
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from sqlalchemy import create_engine, text
+from app import create_app, db
+from app.config import TestingConfig
+from app.models.user import User
+from app.models.chat_history import ChatHistory
+from app.services.history_writer import save_chat_history
+
+@pytest.fixture
+def app(tmp_path):
+    class AsyncCommitConfig(TestingConfig):
+        CHAT_HISTORY_ASYNC_COMMIT = True
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "chat.db"}'
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+    
+    with patch.dict('app._CONFIGS', {'testing': AsyncCommitConfig}):
+        app = create_app('testing')
+    
+    with app.app_context():
+        user = User(username='writer', email='writer@example.com', password='Test@123')
+        db.session.add(user)
+        db.session.commit()
+    return app
+
+def test_save_chat_history_in_background(app):
+    """Test that concurrent rows get their own ids and are committed."""
+    def save(i):
+        with app.app_context():
+            return save_chat_history(1, f'Question {i}', f'Answer {i}')
+    
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        chat_ids = list(executor.map(save, range(8)))
+    
+    assert len(set(chat_ids)) == 8
+    
+    # The commit finishes after the ids are returned
+    with app.app_context():
+        _wait_for_rows(8)
+        
+        for i, chat_id in enumerate(chat_ids):
+            chat = db.session.get(ChatHistory, chat_id)
+            assert chat.question == f'Question {i}'
+            assert chat.response == f'Answer {i}'
+            assert chat.timestamp is not None
+        
+        assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert db.session.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+
+def test_sqlite_pragmas_only_apply_to_the_app_engine(tmp_path):
+    """Test that synchronous commits keep full fsync and other engines are untouched."""
+    class FileConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "chat.db"}'
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+    
+    with patch.dict('app._CONFIGS', {'testing': FileConfig}):
+        app = create_app('testing')
+    
+    with app.app_context():
+        assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert db.session.execute(text('PRAGMA synchronous')).scalar() == 2  # FULL
+    
+    with create_engine(f'sqlite:///{tmp_path / "other.db"}').connect() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'delete'
+
+def test_save_chat_history_without_returning(app):
+    """Test the writer on databases without INSERT ... RETURNING."""
+    with app.app_context():
+        with patch.object(db.engine.dialect, 'insert_returning', False):
+            chat_id = save_chat_history(1, 'Question', 'Answer')
+        
+        _wait_for_rows(1)
+        assert db.session.get(ChatHistory, chat_id).question == 'Question'
+
+def test_save_chat_history_falls_back_when_writer_stops(app):
+    """Test that a stopped writer neither hangs requests nor duplicates rows."""
+    app.config['CHAT_HISTORY_WRITE_TIMEOUT'] = 0.1
+    
+    with app.app_context():
+        # A writer that exits at once leaves the row queued; it's written inline
+        with patch('app.services.history_writer._write_batches'):
+            first_id = save_chat_history(1, 'Question 1', 'Answer 1')
+        assert db.session.get(ChatHistory, first_id).question == 'Question 1'
+        
+        # The next call restarts the writer, which skips the withdrawn row
+        app.config['CHAT_HISTORY_WRITE_TIMEOUT'] = 5
+        second_id = save_chat_history(1, 'Question 2', 'Answer 2')
+        
+        _wait_for_rows(2)
+        assert second_id != first_id
+        assert ChatHistory.query.count() == 2
+
+def _wait_for_rows(count):
+    """Wait for the background commit to make `count` rows visible."""
+    for _ in range(50):
+        if ChatHistory.query.count() == count:
+            return
+        db.session.rollback()
+        time.sleep(0.02)
+    assert ChatHistory.query.count() == count
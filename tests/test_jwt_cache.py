@@ -0,0 +1,64 @@
+import time
+import pytest
+from datetime import timedelta
+from unittest.mock import patch
+from flask_jwt_extended import JWTManager, create_access_token
+from jwt import ExpiredSignatureError
+from app import jwt
+
+@pytest.fixture
+def app(_app):
+    jwt._payload_cache.clear()
+    with _app.app_context():
+        yield _app
+
+def _count_decodes():
+    """Patch the uncached decode, still running it, to count calls."""
+    return patch.object(
+        JWTManager,
+        '_decode_jwt_from_config',
+        autospec=True,
+        side_effect=JWTManager._decode_jwt_from_config
+    )
+
+def test_cached_token_skips_verification(app):
+    """Test that a repeated token is decoded once and then served from the cache."""
+    token = create_access_token(identity='1')
+    
+    with _count_decodes() as decode:
+        first = jwt._decode_jwt_from_config(token)
+        second = jwt._decode_jwt_from_config(token)
+    
+    assert decode.call_count == 1
+    assert first == second
+    assert first['sub'] == '1'
+    
+    # Callers get their own copy of the cached payload
+    second['sub'] = '2'
+    assert jwt._decode_jwt_from_config(token)['sub'] == '1'
+
+def test_cached_token_rejected_after_expiry(app):
+    """Test that a cached token is verified again, and rejected, once it expires."""
+    token = create_access_token(identity='1', expires_delta=timedelta(seconds=1))
+    jwt._decode_jwt_from_config(token)
+    
+    time.sleep(1.1)
+    
+    with pytest.raises(ExpiredSignatureError):
+        jwt._decode_jwt_from_config(token)
+
+@pytest.mark.parametrize('kwargs', [
+    {'allow_expired': True},
+    {'csrf_value': 'csrf-token'},
+])
+def test_uncacheable_decodes_bypass_cache(app, kwargs):
+    """Test that expired-token and CSRF decodes always reach flask-jwt-extended."""
+    token = create_access_token(identity='1')
+    
+    with patch.object(JWTManager, '_decode_jwt_from_config', return_value={'sub': '1'}) as decode:
+        for _ in range(2):
+            jwt._decode_jwt_from_config(token, **kwargs)
+    
+    assert decode.call_count == 2
+    decode.assert_called_with(token, kwargs.get('csrf_value'), kwargs.get('allow_expired', False))
+    assert len(jwt._payload_cache) == 0
@@ -0,0 +1,127 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app import create_app
+from app.services.llama_service import LlamaService
+from app.services.semantic_cache import SemanticCache
+
+@pytest.fixture
+def app():
+    return create_app('testing')
+
+def test_get_response_batches_concurrent_questions(app):
+    """Test that concurrent questions are dispatched as one batch."""
+    service = LlamaService()
+    
+    async def ask_all():
+        with app.app_context():
+            return await asyncio.gather(*(
+                service.get_response(f'Question {i}') for i in range(3)
+            ))
+    
+    with patch.object(LlamaService, '_run_agent', side_effect=lambda query: f'Answer to {query}'), \
+            patch.object(LlamaService, '_run_batch', autospec=True, side_effect=LlamaService._run_batch) as run_batch:
+        responses = asyncio.run(ask_all())
+    
+    assert responses == ['Answer to Question 0', 'Answer to Question 1', 'Answer to Question 2']
+    assert run_batch.call_count == 1
+    assert len(run_batch.call_args.args[1]) == 3
+
+def test_run_batch_skips_cancelled_questions(app, llm):
+    """Test that the agent is not run for a question its caller gave up on."""
+    service = LlamaService()
+    
+    async def run():
+        with app.app_context():
+            service._start_batcher()
+            loop = asyncio.get_running_loop()
+            abandoned, waiting = loop.create_future(), loop.create_future()
+            abandoned.cancel()
+            await service._run_batch([('Abandoned', abandoned), ('Waiting', waiting)])
+            return waiting.result()
+    
+    assert asyncio.run(run()) == 'This is a test response.'
+    llm.assert_called_once_with('Waiting')
+
+def test_stream_response_respects_concurrency_limit(app):
+    """Test that concurrent streams share the LLAMA_CONCURRENCY cap."""
+    app.config['LLAMA_CONCURRENCY'] = 1
+    service = LlamaService()
+    service._agent = object()
+    active = []
+    peak = []
+    
+    class FakeStreamingEngine:
+        async def aquery(self, query):
+            active.append(query)
+            peak.append(len(active))
+            return self
+        
+        async def async_response_gen(self):
+            await asyncio.sleep(0.01)
+            yield active.pop()
+    
+    service._streaming_query_engine = FakeStreamingEngine()
+    
+    async def stream(query):
+        with app.app_context():
+            return [token async for token in service.stream_response(query)]
+    
+    async def stream_all():
+        return await asyncio.gather(stream('Question 1'), stream('Question 2'))
+    
+    assert sorted(asyncio.run(stream_all())) == [['Question 1'], ['Question 2']]
+    assert max(peak) == 1
+
+def test_warmup_builds_service_and_retrieves(app):
+    """Test that warmup builds the components and opens a retrieval connection."""
+    service = LlamaService()
+    retriever = AsyncMock()
+    
+    def build():
+        service._retriever = retriever
+    
+    async def warm_up():
+        with app.app_context():
+            await service._warmup()
+    
+    with patch.object(LlamaService, '_ensure_initialized', side_effect=build) as ensure_initialized:
+        asyncio.run(warm_up())
+    
+    assert ensure_initialized.call_count == 1
+    assert retriever.aretrieve.await_count == 1
+
+def test_build_retriever_passes_search_settings(app):
+    """Test that the retriever is built with the intended top-k and reranking."""
+    app.config['LLAMA_CLOUD_INDEX_NAME'] = 'leadership'
+    service = LlamaService()
+    resolved = (MagicMock(), MagicMock())
+    
+    with patch('llama_index.indices.managed.llama_cloud.base.resolve_project_and_pipeline', return_value=resolved), \
+            patch('llama_index.indices.managed.llama_cloud.retriever.resolve_project_and_pipeline', return_value=resolved), \
+            app.app_context():
+        _, retriever = service._build_retriever()
+    
+    assert retriever._dense_similarity_top_k == 15
+    assert retriever._enable_reranking is True
+    assert retriever._rerank_top_n == 6
+    assert retriever._retrieval_mode == 'chunks'
+
+def test_stream_response_shares_semantic_cache(app, llm, fake_embedding):
+    """Test that an answer cached by get_response is streamed without the LLM."""
+    app.config['SEMANTIC_CACHE_ENABLED'] = True
+    service = LlamaService()
+    # Every question maps to the same vector
+    service._semantic_cache = SemanticCache(fake_embedding(default=[1.0, 0.0]))
+    
+    async def ask_then_stream():
+        with app.app_context():
+            response = await service.get_response('What makes a good leader?')
+            tokens = [token async for token in service.stream_response('What makes a great leader?')]
+            return response, tokens
+    
+    response, tokens = asyncio.run(ask_then_stream())
+    
+    assert tokens == [response]
+    assert llm.call_count == 1
+
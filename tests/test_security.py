@@ -0,0 +1,47 @@
+import pytest
+from app.utils.security import validate_email, validate_password, sanitize_input
+
+def test_validate_email_normalizes_address():
+    """Test that a valid email is returned in normalized form."""
+    assert validate_email('Leader@EXAMPLE.com') == (True, 'Leader@example.com')
+
+def test_validate_email_rejects_invalid_address():
+    """Test that an invalid email is reported on every call."""
+    for _ in range(2):
+        is_valid, message = validate_email('not-an-email')
+        assert not is_valid
+        assert message
+
+@pytest.mark.parametrize('password, message', [
+    ('Te@1', 'Password must be at least 8 characters long.'),
+    ('Test@abcd', 'Password must contain at least one digit.'),
+    ('test@1234', 'Password must contain at least one uppercase letter.'),
+    ('TEST@1234', 'Password must contain at least one lowercase letter.'),
+    ('Test12345', 'Password must contain at least one special character.'),
+])
+def test_validate_password_rejects_weak_passwords(password, message):
+    """Test that each password requirement is reported."""
+    assert validate_password(password) == (False, message)
+
+def test_validate_password_accepts_strong_password():
+    """Test a password meeting every requirement."""
+    assert validate_password('Test@123') == (True, 'Password is valid.')
+
+@pytest.mark.parametrize('raw, expected', [
+    ('What makes a good leader?', 'What makes a good leader?'),
+    ('Hello <script>alert(1)</script>world', 'Hello world'),
+    ('<b>Bold</b> move', 'Bold move'),
+    ('Hi <SCRIPT type="x">alert(1)</SCRIPT>there', 'Hi there'),
+    ('1 < 2 and\n3 > 2', '1 < 2 and\n3 > 2'),
+    ('if a<b\nthen c>d', 'if a<b\nthen c>d'),
+    ('<b<script>x</script>', '<b'),
+    ('<scr<script>x</script>ipt>alert(1)</script>', 'alert(1)'),
+    ('name; DROP TABLE users', 'name;  TABLE users'),
+    ("x' OR 1=1", "x' "),
+    ('OR SELECT a=b', ''),
+    ('', ''),
+    (None, None),
+])
+def test_sanitize_input(raw, expected):
+    """Test removal of HTML and SQL injection patterns."""
+    assert sanitize_input(raw) == expected
@@ -0,0 +1,43 @@
+import asyncio
+from app.services.semantic_cache import SemanticCache
+
+# Fixed vectors for known questions
+VECTORS = {
+    'what makes a good leader?': [1.0, 0.0, 0.0],
+    'what makes someone a good leader?': [0.98, 0.2, 0.0],
+    'how do i give feedback?': [0.0, 1.0, 0.0],
+    'how should teams resolve conflict?': [0.0, 0.0, 1.0],
+}
+
+def _embed(cache, text):
+    return asyncio.run(cache.embed(text))
+
+def test_lookup_returns_response_for_similar_question(fake_embedding):
+    """Test that a rephrased question hits the cached response."""
+    cache = SemanticCache(fake_embedding(VECTORS), threshold=0.9)
+    cache.insert(_embed(cache, 'What makes a good leader?'), 'Vision and integrity.')
+    
+    assert cache.lookup(_embed(cache, '  What makes someone a good leader?')) == 'Vision and integrity.'
+
+def test_lookup_misses_below_threshold(fake_embedding):
+    """Test that an unrelated question is not answered from the cache."""
+    cache = SemanticCache(fake_embedding(VECTORS), threshold=0.9)
+    assert cache.lookup(_embed(cache, 'How do I give feedback?')) is None
+    
+    cache.insert(_embed(cache, 'What makes a good leader?'), 'Vision and integrity.')
+    
+    assert cache.lookup(_embed(cache, 'How do I give feedback?')) is None
+
+def test_insert_evicts_least_recently_used(fake_embedding):
+    """Test that a full cache evicts the entry unused the longest."""
+    cache = SemanticCache(fake_embedding(VECTORS), threshold=0.9, maxsize=2)
+    cache.insert(_embed(cache, 'What makes a good leader?'), 'Vision and integrity.')
+    cache.insert(_embed(cache, 'How do I give feedback?'), 'Be specific.')
+    
+    # Using the first entry makes the second the least recently used
+    cache.lookup(_embed(cache, 'What makes a good leader?'))
+    cache.insert(_embed(cache, 'How should teams resolve conflict?'), 'Talk it through.')
+    
+    assert cache.lookup(_embed(cache, 'What makes a good leader?')) == 'Vision and integrity.'
+    assert cache.lookup(_embed(cache, 'How do I give feedback?')) is None
+    assert cache.lookup(_embed(cache, 'How should teams resolve conflict?')) == 'Talk it through.'